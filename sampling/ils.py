@@ -7,14 +7,22 @@
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import random
-import copy
-import logging
 import getopt
+import multiprocessing as mp
+import concurrent.futures
 import zipfile
 import sys
 import os
+
+import numpy as np
+
+import kernels
 from problems import Knapsack, NumberPartitioning
 
+# Module-level generator used for the randomized neighborhood order; workers
+# reseed it (together with the stdlib RNG) for reproducible parallel runs.
+_rng = np.random.default_rng()
+
 
 class Solution:
     """Represents a solution.
@@ -27,23 +35,31 @@ class Solution:
                   of the solution
     """
 
-    def __init__(self, lst=[], fitness=0, invalid=False):
+    def __init__(self, lst=None, fitness=0, invalid=False):
         self.fitness = fitness
         self.invalid = invalid
-        self.lst = lst
+        self.lst = [] if lst is None else lst
+        self._str_cache = None
 
     def __str__(self):
-        #return str(self.fitness) + (" (invalid) " if self.invalid else " ") + ','.join(str(i) for i in self.lst)
-        return str(self.fitness) + (" (invalid) " if self.invalid else " ") + ''.join(str(i) for i in self.lst)
-
-    def init_rnd_bitstring(self, n):
+        # The string is cached until the solution is mutated; ils logs the
+        # unchanged current best on every jump attempt.
+        if self._str_cache is None:
+            #self._str_cache = str(self.fitness) + (" (invalid) " if self.invalid else " ") + ','.join(str(i) for i in self.lst)
+            self._str_cache = str(self.fitness) + (" (invalid) " if self.invalid else " ") + ''.join(str(i) for i in self.lst)
+        return self._str_cache
+
+    def init_rnd_bitstring(self, n, rng=None):
         """Initialize the lst attribute to a uniformly random bitstring of length n.
 
         :param n: length of the bitstring
+        :param rng: a numpy Generator to draw from; defaults to the module one
         :return:
         """
-        self.lst = [random.randint(0, 1) for i in range(n)]
+        gen = _rng if rng is None else rng
+        self.lst = gen.integers(0, 2, size=n, dtype=np.int8)
         self.invalid = True
+        self._str_cache = None
 
     def init_rnd_permutation(self, n):
         """Initialize the lst attribute to a random permutation of length n.
@@ -54,6 +70,111 @@ class Solution:
         self.lst = list(range(n))
         random.shuffle(self.lst)
         self.invalid = True
+        self._str_cache = None
+
+    def size(self):
+        """Returns the number of variables in the solution."""
+        return len(self.lst)
+
+    def clone(self):
+        """Returns a copy of the solution with a shallow-copied representation.
+
+        Much cheaper than copy.deepcopy: the representation is duplicated with
+        a single copy() (a plain rebind for an int bitmask) and any cached
+        values set by the evaluators are carried over as-is.
+        """
+        new_sol = self.__class__.__new__(self.__class__)
+        new_sol.__dict__.update(self.__dict__)
+        if not isinstance(self.lst, int):
+            new_sol.lst = self.lst.copy()
+        return new_sol
+
+
+class BitmaskSolution(Solution):
+    """Represents a bitstring solution of length n <= 64 packed into a single
+    Python int, so that a bit flip is one XOR and the fitness of OneMax is one
+    C-level popcount (int.bit_count).
+
+    Attributes:
+        lst - the bitmask; bit i holds the value of variable i
+        n - length of the bitstring
+    """
+
+    def __init__(self, lst=0, n=0, fitness=0, invalid=False):
+        super().__init__(lst, fitness, invalid)
+        self.n = n
+
+    def __str__(self):
+        if self._str_cache is None:
+            self._str_cache = str(self.fitness) + (" (invalid) " if self.invalid else " ") \
+                + ''.join(str((self.lst >> i) & 1) for i in range(self.n))
+        return self._str_cache
+
+    def init_rnd_bitstring(self, n, rng=None):
+        """Initialize the lst attribute to a uniformly random bitmask of length n.
+
+        :param n: length of the bitstring (at most 64)
+        :param rng: a random.Random to draw from; defaults to the module RNG
+        :return:
+        """
+        self.lst = (random if rng is None else rng).getrandbits(n)
+        self.n = n
+        self.invalid = True
+        self._str_cache = None
+
+    def size(self):
+        return self.n
+
+
+class PackedBitSolution(Solution):
+    """Represents a bitstring solution of arbitrary length packed into an
+    array of 64-bit words, for lengths beyond what BitmaskSolution covers.
+    Bit i of the solution lives in word i >> 6; the pad bits of the last
+    word are kept at zero so a popcount over the words is the number of
+    set variables.
+
+    Attributes:
+        lst - uint64 array of ceil(n/64) words
+        n - length of the bitstring
+    """
+
+    def __init__(self, lst=None, n=0, fitness=0, invalid=False):
+        if lst is None:
+            lst = np.zeros((n + 63) // 64, dtype=np.uint64)
+        super().__init__(lst, fitness, invalid)
+        self.n = n
+
+    def __str__(self):
+        if self._str_cache is None:
+            self._str_cache = str(self.fitness) + (" (invalid) " if self.invalid else " ") \
+                + ''.join(str(self.bit(i)) for i in range(self.n))
+        return self._str_cache
+
+    def init_rnd_bitstring(self, n, rng=None):
+        """Initialize the lst attribute to uniformly random words of total length n.
+
+        :param n: length of the bitstring
+        :param rng: a numpy Generator to draw from; defaults to the module one
+        :return:
+        """
+        gen = _rng if rng is None else rng
+        self.lst = gen.integers(0, 2 ** 64, size=(n + 63) // 64, dtype=np.uint64)
+        if n % 64:
+            self.lst[-1] &= np.uint64((1 << (n % 64)) - 1) # clear the pad bits
+        self.n = n
+        self.invalid = True
+        self._str_cache = None
+
+    def size(self):
+        return self.n
+
+    def bit(self, i):
+        """Returns bit i of the solution."""
+        return int(self.lst[i >> 6] >> np.uint64(i & 63)) & 1
+
+    def flip(self, i):
+        """Flips bit i of the solution in place."""
+        self.lst[i >> 6] ^= np.uint64(1 << (i & 63))
 
 
 def flip_neighbour_explorer(sol, problem_instance, first_improvement=True):
@@ -65,45 +186,84 @@ def flip_neighbour_explorer(sol, problem_instance, first_improvement=True):
     :param first_improvement: True for first improvement; false for best improvement
     :return: a boolean indicating whether an improving solution was found and the actual solution found
     """
-    indices = list(range(len(sol.lst)))
+    # Best improvement with a vectorized neighborhood: one NumPy pass over all
+    # n flips replaces the per-index scan entirely.
+    if not first_improvement and hasattr(problem_instance, "best_flip"):
+        best_i, best_fitness = problem_instance.best_flip(sol)
+        if problem_instance.strictly_better(best_fitness, sol.fitness):
+            new_sol = sol.clone()
+            problem_instance.flip_with_delta(new_sol, best_i, best_fitness - sol.fitness)
+            return True, new_sol
+        return False, sol
+
+    # First improvement visits the neighbors in random order: one C-level
+    # permutation instead of a Python-level shuffle. Best improvement scans
+    # all of them anyway, so the order is left as is.
+    # (tolist() yields plain ints, which the bitmask shifts require)
+    indices = _rng.permutation(sol.size()).tolist() if first_improvement else range(sol.size())
+    improved = False
     best_delta_fitness = 0
-    best_sol = copy.deepcopy(sol)
     best_i = indices[0]
-    improved = False
+    for i in indices:
+        improving, delta_fitness = problem_instance.flip_delta_eval(sol, i)
+        if improving:
+            improved = True
+            if problem_instance.strictly_better(delta_fitness, best_delta_fitness):
+                best_delta_fitness = delta_fitness
+                best_i = i
+            if first_improvement:
+                break
+    if improved:
+        new_sol = sol.clone()
+        problem_instance.flip_with_delta(new_sol, best_i, best_delta_fitness)
+        return improved, new_sol
+    return improved, sol
 
-    if first_improvement:
-        random.shuffle(indices)
 
-    for i in indices:
-        if problem_instance.has_flip_delta_eval():
-            improved, delta_fitness = problem_instance.flip_delta_eval(sol, i)
-            if improved:
-                if problem_instance.strictly_better(delta_fitness, best_delta_fitness):
-                    best_delta_fitness = delta_fitness
-                    best_i = i
-                if first_improvement:
+def hc_flip(sol, problem_instance, first_improvement=True):
+    """Hill climbs the flip neighborhood to a local optimum.
+
+    Fuses hc and flip_neighbour_explorer into one loop: the problem methods
+    are looked up once instead of on every neighbor evaluation, and improving
+    flips are applied to the solution in place instead of cloning it per step.
+
+    :param sol: the initial solution, modified in place
+    :param problem_instance: the problem instance associated to the solution
+    :param first_improvement: True for first improvement, false for best improvement
+    :return: the local optimum found
+    """
+    strictly_better = problem_instance.strictly_better
+    flip_delta_eval = problem_instance.flip_delta_eval
+    flip_with_delta = problem_instance.flip_with_delta
+    best_flip = getattr(problem_instance, "best_flip", None) if not first_improvement else None
+    permutation = _rng.permutation
+    n = sol.size()
+
+    while True:
+        if best_flip is not None:
+            best_i, best_fitness = best_flip(sol)
+            if not strictly_better(best_fitness, sol.fitness):
+                return sol
+            flip_with_delta(sol, best_i, best_fitness - sol.fitness)
+        elif first_improvement:
+            for i in permutation(n).tolist():
+                improving, delta_fitness = flip_delta_eval(sol, i)
+                if improving:
+                    flip_with_delta(sol, i, delta_fitness)
                     break
+            else:
+                return sol
         else:
-            new_sol = copy.deepcopy(sol)
-            new_sol.lst[i] = 0 if (new_sol.lst[i] == 1) else 1
-            problem_instance.full_eval(new_sol)
-            if problem_instance.strictly_better(new_sol.fitness, sol.fitness):
-                improved = True
-                if problem_instance.strictly_better(new_sol.fitness, best_sol.fitness):
-                    best_sol = new_sol
+            best_i = -1
+            best_delta_fitness = 0
+            for i in range(n):
+                improving, delta_fitness = flip_delta_eval(sol, i)
+                if improving and strictly_better(delta_fitness, best_delta_fitness):
+                    best_delta_fitness = delta_fitness
                     best_i = i
-                if first_improvement:
-                    break
-
-    if improved:
-        if problem_instance.has_flip_delta_eval():
-            new_sol = copy.deepcopy(sol)
-            problem_instance.flip_with_delta(new_sol, best_i, delta_fitness)
-            return improved, new_sol
-        else:
-            return improved, best_sol
-    else:
-        return improved, sol
+            if best_i < 0:
+                return sol
+            flip_with_delta(sol, best_i, best_delta_fitness)
 
 
 def hc(init_sol, problem_instance, neighbour_explorer, first_improvement=True):
@@ -115,70 +275,157 @@ def hc(init_sol, problem_instance, neighbour_explorer, first_improvement=True):
     :param first_improvement: True for first improvement, false for best improvement
     :return: a boolean indicating whether an improving solution was found and the actual solution found
     """
+    # With an array-backed solution and the standard flip neighborhood, run
+    # the whole climb inside the problem's compiled kernel.
+    if neighbour_explorer is flip_neighbour_explorer:
+        # the kernels work on the one-byte-per-bit representation only
+        if problem_instance.jit_hc is not None and isinstance(init_sol.lst, np.ndarray) \
+                and init_sol.lst.dtype == np.int8:
+            return problem_instance.jit_hc(init_sol, first_improvement)
+        return hc_flip(init_sol, problem_instance, first_improvement)
+
     improved, sol = neighbour_explorer(init_sol, problem_instance, first_improvement)
     while improved:
         improved, sol = neighbour_explorer(sol, problem_instance, first_improvement)
     return sol
 
 
-def logger(filename):
-    lon_logger = logging.getLogger("LON_logger")
-    lon_logger.setLevel(logging.INFO)
-    lon_log_fh = logging.FileHandler(filename)
-    lon_log_fh.setLevel(logging.INFO)
-    lon_log_sh = logging.StreamHandler()
-    lon_log_sh.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(message)s')
-    lon_log_fh.setFormatter(formatter)
-    lon_logger.addHandler(lon_log_fh)
-    lon_logger.addHandler(lon_log_sh)
-    return lon_logger
+class BufferedLogger:
+    """Collects log lines in memory and writes them out in a single call.
 
+    Replaces the logging-module setup previously used by ils, which paid for
+    formatting, lock acquisition and two handler dispatches (file + stream)
+    on every jump attempt of the hot loop.
 
-def close_handlers(lon_logger):
-    for h in list(lon_logger.handlers):
-        lon_logger.removeHandler(h)
-        h.flush()
-        h.close()
+    Attributes:
+        filename - the destination file, written on close(); with None the
+                   content stays in memory and is read back with getvalue(),
+                   e.g. to archive it straight into a zip
+    """
 
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._lines = []
 
-def ils(sol, problem_instance, local_search, neighbour_explorer, logname, non_impr_iters=100, first_improvement=True):
+    def info(self, fmt, *args):
+        self._lines.append(fmt % args if args else fmt)
+
+    def getvalue(self):
+        """Returns the buffered content as a single string."""
+        return '\n'.join(self._lines) + ('\n' if self._lines else '')
+
+    def close(self):
+        """Writes the buffered lines to the file in one call."""
+        if self.filename is not None:
+            with open(self.filename, 'w') as out:
+                out.write(self.getvalue())
+
+
+def _perturb_and_climb(args):
+    """Perturbs a copy of the solution and runs the local search on it.
+
+    Worker for the parallel perturbation mode of ils; seeds the per-process
+    random streams from the job-specific seed so the k concurrent jobs of a
+    tick explore independent perturbations reproducibly.
+
+    :param args: a (sol, problem_instance, local_search, neighbour_explorer,
+                 first_improvement, seed) tuple
+    :return: the local optimum reached from the perturbed copy
+    """
+    global _rng
+    sol, problem_instance, local_search, neighbour_explorer, first_improvement, seed = args
+    random.seed(seed)
+    kernels.seed_kernels(seed)
+    _rng = np.random.default_rng(seed)
+    problem_instance.seed_rng(seed)
+    s = sol.clone()
+    problem_instance.two_rnd_flips(s)
+    return local_search(s, problem_instance, neighbour_explorer, first_improvement)
+
+
+def ils(sol, problem_instance, local_search, neighbour_explorer, lon_logger, non_impr_iters=100, first_improvement=True, perturbations=1):
     """Iterated local search
 
     :param sol: the initial solution
     :param problem_instance: the problem instance associated to the solution
     :param local_search: a local search function
     :param neighbour_explorer: a neighborhood explorer function
-    :param logname: file name of the log file
+    :param lon_logger: a BufferedLogger receiving one line per jump attempt
     :param non_impr_iters: the number of consecutive non improving iterations after which the search is stopped
     :param first_improvement: True for first improvement, false for best improvement
+    :param perturbations: the number of perturbed starts explored concurrently
+                          per iteration; with more than one they run in a
+                          process pool and the best result is kept
     :return: the best local optimum found
     """
 
-    lon_logger = logger(logname) # start logging 
+    executor = None
+    if perturbations > 1:
+        mp_context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=perturbations,
+                                                          mp_context=mp_context)
+
     lo = local_search(sol, problem_instance, neighbour_explorer, first_improvement)
-    best_lo = copy.deepcopy(lo)
+    best_lo = lo.clone()
     non_improvement_cnt = 0
     while non_improvement_cnt < non_impr_iters:
-        s = copy.deepcopy(best_lo)
-        problem_instance.two_rnd_flips(s)
-        lo = local_search(s, problem_instance, neighbour_explorer, first_improvement)
-        lon_logger.info("%s %s", str(best_lo), str(lo)) # log jump attempt 
-        if problem_instance.better_or_equal(lo.fitness, best_lo.fitness):
-            best_lo = copy.deepcopy(lo)
-            if problem_instance.strictly_better(lo.fitness, best_lo.fitness):
-                non_improvement_cnt = 0
-            else:
-                non_improvement_cnt += 1
+        if executor is not None:
+            jobs = [(best_lo, problem_instance, local_search, neighbour_explorer,
+                     first_improvement, random.randrange(2 ** 32))
+                    for _ in range(perturbations)]
+            los = list(executor.map(_perturb_and_climb, jobs))
+        else:
+            s = best_lo.clone()
+            problem_instance.two_rnd_flips(s)
+            los = [local_search(s, problem_instance, neighbour_explorer, first_improvement)]
+        lo = los[0]
+        for cand in los:
+            lon_logger.info("%s %s", str(best_lo), str(cand)) # log jump attempt
+            if problem_instance.strictly_better(cand.fitness, lo.fitness):
+                lo = cand
+        if problem_instance.strictly_better(lo.fitness, best_lo.fitness):
+            best_lo = lo
+            non_improvement_cnt = 0
         else:
+            if problem_instance.better_or_equal(lo.fitness, best_lo.fitness):
+                best_lo = lo # sideways move to an equal-fitness optimum
             non_improvement_cnt += 1
-    close_handlers(lon_logger) # close files used by logger
+    if executor is not None:
+        executor.shutdown()
+    lon_logger.close() # flush the buffered lines to disk
     return best_lo
 
 
+def _one_run(args):
+    """Runs one independent ILS and returns its log as text.
+
+    Worker for the multiprocessing pool in main. The per-process RNGs are
+    seeded from the run-specific seed so results are reproducible regardless
+    of which worker picks up which run.
+
+    :param args: a (run, seed, non_impr_iters, file) tuple; file is the name
+                 of a knapsack instance or None for the default NPP instance
+    :return: the archive name for the run and the log content
+    """
+    global _rng
+    run, seed, non_impr_iters, file = args
+    random.seed(seed)
+    np.random.seed(seed)
+    kernels.seed_kernels(seed)
+    _rng = np.random.default_rng(seed)
+    instance = Knapsack(file) if file else NumberPartitioning(20, 0.5, 1)
+    instance.seed_rng(seed)
+    s = Solution()
+    s.init_rnd_bitstring(instance.n, _rng)
+    instance.full_eval(s)
+    lon_logger = BufferedLogger()
+    ils(s, instance, hc, flip_neighbour_explorer, lon_logger, non_impr_iters)
+    return "run" + str(run) + ".dat", lon_logger.getvalue()
+
+
 def main(argv):
 
-    #file = "knap20.txt"
+    file = None
     zipname = "runs.zip"
     nb_runs = 100
     non_impr_iters = 100
@@ -186,41 +433,37 @@ def main(argv):
 
     opts, args = getopt.getopt(argv, "hf:r:i:s:", ["help", "file=", "runs=", "non_impr_iters=", "seed="])
 
-    for opts, args in opts:
-        if opts in ("-h", "--help"):
-            print("Usage: " + sys.argv[0] + " -i <file1> [option]")
+    for opt, val in opts:
+        if opt in ("-h", "--help"):
+            print("Usage: " + sys.argv[0]
+                  + " [-f <knapsack file>] [-r <runs>] [-i <non improving iters>] [-s <seed>]")
             sys.exit()
-        elif opts in ("-f", "--file"):
-            file = opts
+        elif opt in ("-f", "--file"):
+            file = val
             zipname = file + ".runs.zip"
-        elif opts in ("-n", "--runs"):
-            nb_runs = int(opts)
-        elif opts in ("-i", "--non_impr_iters"):
-            non_impr_iters = int(opts)
-        elif opts in ("-s", "--seed"):
-            seed = int(opts)
+        elif opt in ("-r", "--runs"):
+            nb_runs = int(val)
+        elif opt in ("-i", "--non_impr_iters"):
+            non_impr_iters = int(val)
+        elif opt in ("-s", "--seed"):
+            seed = int(val)
         else:
             assert False, "unhandled option"
 
     random.seed(seed)
+    np.random.seed(seed)
 
     zf = zipfile.ZipFile(zipname, 'w', zipfile.ZIP_DEFLATED, True)
 
+    # The runs are completely independent, so dispatch them to one worker
+    # process per core; each run gets its own seed so the whole experiment
+    # stays reproducible for a given -s.
+    run_args = [(run, seed + run, non_impr_iters, file) for run in range(1, nb_runs + 1)]
     try:
-        for run in range(1,nb_runs+1):
-            #instance = Knapsack(file)
-            instance = NumberPartitioning(20, 0.5, 1)
-            print(instance)
-            s = Solution()
-            s.init_rnd_bitstring(instance.n)
-            instance.full_eval(s)
-            print(s)
-            log_name = "run" + str(run) + ".dat"
-            s = ils(s, instance, hc, flip_neighbour_explorer, log_name, non_impr_iters)
-            zf.write(log_name)
-            os.remove(log_name)
-            #print(s)
-            #print(instance.weight(s))
+        with mp.Pool(processes=os.cpu_count()) as pool:
+            # one in-memory write per run, no temp file on disk
+            for log_name, log_text in pool.imap_unordered(_one_run, run_args):
+                zf.writestr(log_name, log_text)
     finally:
         zf.close()
 
@@ -0,0 +1,160 @@
+# Copyright (c) 2018 Gabriela Ochoa and Nadarajen Veerapen.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compiled hill-climb kernels for the flip neighborhood.
+
+Each kernel takes the flat NumPy arrays of a solution/instance, runs the
+local search to convergence with inline delta evaluation, mutates the
+bitstring in place, and returns the values needed to refresh the caches on
+the Solution object. With Numba installed the kernels are JIT-compiled to
+native code; without it they run as plain Python over NumPy arrays, which
+is slower but gives identical results.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+
+
+def popcount(words):
+    """Counts the set bits over an array of 64-bit words.
+
+    :param words: uint64 array
+    :return: the total number of set bits
+    """
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+@njit(cache=True)
+def seed_kernels(s):
+    """Seeds the RNG used inside the compiled kernels.
+
+    Numba keeps its own random state per process; seeding NumPy from the
+    interpreter does not touch it, so reproducible runs must seed through
+    compiled code.
+
+    :param s: the seed
+    """
+    np.random.seed(s)
+
+
+@njit(cache=True)
+def hc_onemax(lst):
+    """Climbs to the OneMax optimum by flipping every zero bit.
+
+    :param lst: int8 bitstring, mutated in place
+    :return: the final fitness
+    """
+    fitness = 0
+    for i in range(lst.shape[0]):
+        if lst[i] == 0:
+            lst[i] = 1
+        fitness += 1
+    return fitness
+
+
+@njit(cache=True)
+def hc_npp(lst, a, first_improvement):
+    """Climbs the NPP flip landscape to a local optimum.
+
+    :param lst: int8 bitstring, mutated in place
+    :param a: int64 array of item values
+    :param first_improvement: True for first improvement, false for best improvement
+    :return: the final signed sum (fitness is its absolute value)
+    """
+    n = lst.shape[0]
+    signed = 0
+    for i in range(n):
+        signed += a[i] if lst[i] == 0 else -a[i]
+    while True:
+        if first_improvement:
+            found = False
+            for i in np.random.permutation(n):
+                cand = signed + (2 * a[i] if lst[i] == 1 else -2 * a[i])
+                if abs(cand) < abs(signed):
+                    signed = cand
+                    lst[i] = 1 - lst[i]
+                    found = True
+                    break
+            if not found:
+                break
+        else:
+            best_i = -1
+            best_signed = signed
+            for i in range(n):
+                cand = signed + (2 * a[i] if lst[i] == 1 else -2 * a[i])
+                if abs(cand) < abs(best_signed):
+                    best_signed = cand
+                    best_i = i
+            if best_i < 0:
+                break
+            signed = best_signed
+            lst[best_i] = 1 - lst[best_i]
+    return signed
+
+
+@njit(cache=True)
+def hc_knap(lst, weights, values, c, first_improvement):
+    """Climbs the knapsack flip landscape to a local optimum.
+
+    :param lst: int8 bitstring, mutated in place
+    :param weights: int64 array of item weights
+    :param values: int64 array of item values
+    :param c: the capacity
+    :param first_improvement: True for first improvement, false for best improvement
+    :return: the final total weight and total value
+    """
+    n = lst.shape[0]
+    weight = 0
+    value = 0
+    for i in range(n):
+        if lst[i] == 1:
+            weight += weights[i]
+            value += values[i]
+    while True:
+        fitness = 0 if weight > c else value
+        if first_improvement:
+            found = False
+            for i in np.random.permutation(n):
+                sign = -1 if lst[i] == 1 else 1
+                new_weight = weight + sign * weights[i]
+                new_value = value + sign * values[i]
+                if (0 if new_weight > c else new_value) > fitness:
+                    weight = new_weight
+                    value = new_value
+                    lst[i] = 1 - lst[i]
+                    found = True
+                    break
+            if not found:
+                break
+        else:
+            best_i = -1
+            best_fitness = fitness
+            for i in range(n):
+                sign = -1 if lst[i] == 1 else 1
+                new_weight = weight + sign * weights[i]
+                new_value = value + sign * values[i]
+                if (0 if new_weight > c else new_value) > best_fitness:
+                    best_fitness = 0 if new_weight > c else new_value
+                    best_i = i
+            if best_i < 0:
+                break
+            sign = -1 if lst[best_i] == 1 else 1
+            weight += sign * weights[best_i]
+            value += sign * values[best_i]
+            lst[best_i] = 1 - lst[best_i]
+    return weight, value
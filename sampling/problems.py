@@ -10,8 +10,56 @@ from abc import ABC, abstractmethod
 import random
 import math
 
+import numpy as np
+
+import kernels
+
+
+def _bit(sol, i):
+    """Returns bit i of a solution in any of the bitstring representations.
+
+    :param sol: the solution
+    :param i: the bit index
+    :return: 0 or 1
+    """
+    if isinstance(sol.lst, int):
+        return (sol.lst >> i) & 1
+    if isinstance(sol.lst, np.ndarray) and sol.lst.dtype == np.uint64:
+        return sol.bit(i)
+    return sol.lst[i]
+
+
+def _flip(sol, i):
+    """Flips bit i of a solution in any of the bitstring representations.
+
+    :param sol: the solution
+    :param i: the bit index
+    """
+    if isinstance(sol.lst, int):
+        sol.lst ^= 1 << i
+    elif isinstance(sol.lst, np.ndarray) and sol.lst.dtype == np.uint64:
+        sol.flip(i)
+    else:
+        sol.lst[i] = 0 if sol.lst[i] == 1 else 1
+
 
 class ProblemInstance(ABC):
+    # Subclasses with a compiled hill-climb kernel override this with a
+    # method running the kernel on an array-backed solution (see kernels.py).
+    jit_hc = None
+
+    def __init__(self):
+        # Each instance owns its random stream, so parallel workers neither
+        # contend on the module-level RNG nor need coordinated reseeding.
+        self._rng = random.Random()
+
+    def seed_rng(self, s):
+        """Seeds the random stream owned by this instance.
+
+        :param s: the seed
+        """
+        self._rng.seed(s)
+
     @abstractmethod
     def maximize(self):
         pass
@@ -27,68 +75,94 @@ class ProblemInstance(ABC):
         pass
 
     @abstractmethod
-    def has_flip_delta_eval(self):
+    def flip_delta_eval(self, sol, i):
         pass
 
     @abstractmethod
-    def flip_delta_eval(self, i):
+    def flip_with_delta(self, sol, i, delta_fitness):
         pass
 
     @abstractmethod
-    def flip_with_delta(self, i):
+    def two_rnd_flips(self, sol):
         pass
 
-    @abstractmethod
-    def two_rnd_flips(self):
-        pass
+    def _flip_two(self, sol):
+        """Flips two distinct uniformly drawn bits of the solution.
+
+        Shared by the two_rnd_flips implementations; random.sample draws the
+        two indices in one call with no rejection loop.
+
+        :param sol: the solution to perturb
+        :return: the two flipped indices
+        """
+        i, j = self._rng.sample(range(self.n), 2)
+        _flip(sol, i)
+        _flip(sol, j)
+        return i, j
 
 
 class OneMax(ProblemInstance):
     def __init__(self, n):
+        super().__init__()
         self.n = n
 
+    def maximize(self):
+        return True
+
     @staticmethod
     def full_eval(sol):
-        sol.fitness = sum(sol.lst)
+        if isinstance(sol.lst, int):
+            sol.fitness = sol.lst.bit_count()
+        elif sol.lst.dtype == np.uint64:
+            sol.fitness = kernels.popcount(sol.lst)
+        else:
+            sol.fitness = int(np.sum(sol.lst))
         sol.invalid = False
-
-    @staticmethod
-    def has_flip_delta_eval():
-        return True
+        sol._str_cache = None
 
     @staticmethod
     def flip_delta_eval(sol, i):
-        delta_fitness = 1 if sol.lst[i] == 0 else -1
+        delta_fitness = 1 if _bit(sol, i) == 0 else -1
         return (delta_fitness > 0), delta_fitness
 
     @staticmethod
     def flip_with_delta(sol, i, delta_fitness):
         sol.fitness += delta_fitness
-        sol.lst[i] = 1 if sol.lst[i] == 0 else 0
+        _flip(sol, i)
         sol.invalid = False
+        sol._str_cache = None
 
     def two_rnd_flips(self, sol):
-        i = random.randint(0, self.n - 1)
-        j = i
-        while j == i:
-            j = random.randint(0, self.n - 1)
-        delta_fitness = (1 if sol.lst[i] == 0 else -1) + (1 if sol.lst[j] == 0 else -1)
+        i, j = self._flip_two(sol)
+        delta_fitness = (1 if _bit(sol, i) else -1) + (1 if _bit(sol, j) else -1)
         sol.fitness += delta_fitness
-        sol.lst[i] = 0 if sol.lst[i] == 1 else 1
-        sol.lst[j] = 0 if sol.lst[j] == 1 else 1
         sol.invalid = False
+        sol._str_cache = None
+
+    def jit_hc(self, sol, first_improvement=True):
+        """Runs the compiled hill-climb kernel on the solution in place."""
+        sol.fitness = int(kernels.hc_onemax(sol.lst))
+        sol.invalid = False
+        sol._str_cache = None
+        return sol
 
 
 class Knapsack(ProblemInstance):
     def __init__(self, filename):
-        with open(filename, 'rU') as kfile:
-            lines = kfile.readlines()
-            self.n = int(lines[0])
-            self.c = int(lines[self.n+1])
-            self.items = [list(map(int, line.split())) for line in lines[1:self.n+1]]
+        super().__init__()
+        # 'rU' mode was removed in Python 3.11; universal newlines are the
+        # default anyway, and reading line by line avoids materializing the
+        # whole file.
+        with open(filename) as kfile:
+            self.n = int(kfile.readline())
+            items = [tuple(map(int, kfile.readline().split())) for _ in range(self.n)]
+            self.c = int(kfile.readline())
+            self.values = np.asarray([item[1] for item in items], dtype=np.int64)
+            self.weights = np.asarray([item[2] for item in items], dtype=np.int64)
 
     def __str__(self):
-        return "Knapsack n=" + str(self.n) + " c=" + str(self.c) + " " + str(self.items)
+        return "Knapsack n=" + str(self.n) + " c=" + str(self.c) \
+            + " values=" + str(self.values) + " weights=" + str(self.weights)
 
     def maximize(self):
         return True
@@ -96,42 +170,80 @@ class Knapsack(ProblemInstance):
     def full_eval(self, sol):
         l = len(sol.lst)
         assert(l == self.n)
-        weight = sum([sol.lst[i] * self.items[i][2] for i in range(l)])
-        if weight > self.c:
-            fitness = 0
-        else:
-            fitness = sum([sol.lst[i] * self.items[i][1] for i in range(l)])
-        sol.fitness = fitness
+        weight = int(self.weights @ sol.lst)
+        value = int(self.values @ sol.lst)
+        sol.fitness = 0 if weight > self.c else value
         sol.weight = weight
+        sol.value = value
         sol.invalid = False
+        sol._str_cache = None
 
     def weight(self, sol):
-        return sum([sol.lst[i] * self.items[i][2] for i in range(len(sol.lst))])
+        return int(self.weights @ sol.lst)
 
-    @staticmethod
-    def has_flip_delta_eval():
-        return False
+    def flip_delta_eval(self, sol, i):
+        """Computes the fitness change of flipping bit i without evaluating
+        the whole solution, using the weight and value cached by full_eval.
 
-    @staticmethod
-    def flip_delta_eval(sol, i):
-        raise NotImplementedError()
+        :param sol: the solution whose neighbor is evaluated
+        :param i: the index of the bit to flip
+        :return: a boolean indicating an improving flip and the fitness delta
+        """
+        sign = -1 if sol.lst[i] == 1 else 1
+        new_weight = sol.weight + sign * int(self.weights[i])
+        if new_weight > self.c:
+            new_fitness = 0
+        else:
+            new_fitness = sol.value + sign * int(self.values[i])
+        delta_fitness = new_fitness - sol.fitness
+        return (delta_fitness > 0), delta_fitness
 
-    @staticmethod
-    def flip_with_delta(sol, i, delta_fitness):
-        raise NotImplementedError()
+    def flip_with_delta(self, sol, i, delta_fitness):
+        sign = -1 if sol.lst[i] == 1 else 1
+        sol.weight += sign * int(self.weights[i])
+        sol.value += sign * int(self.values[i])
+        sol.lst[i] = 1 if sol.lst[i] == 0 else 0
+        sol.fitness = 0 if sol.weight > self.c else sol.value
+        sol.invalid = False
+        sol._str_cache = None
 
-    def two_rnd_flips(self, sol):
+    def best_flip(self, sol):
+        """Evaluates all n flip neighbors in one vectorized pass.
+
+        :param sol: the solution whose neighborhood is evaluated
+        :return: the index of the best flip and the fitness after that flip
         """
+        new_weight = sol.weight + np.where(sol.lst == 1, -self.weights, self.weights)
+        new_value = sol.value + np.where(sol.lst == 1, -self.values, self.values)
+        new_fitness = np.where(new_weight > self.c, 0, new_value)
+        i = int(np.argmax(new_fitness))
+        return i, int(new_fitness[i])
+
+    def jit_hc(self, sol, first_improvement=True):
+        """Runs the compiled hill-climb kernel on the solution in place."""
+        weight, value = kernels.hc_knap(sol.lst, self.weights, self.values,
+                                        self.c, first_improvement)
+        sol.weight = int(weight)
+        sol.value = int(value)
+        sol.fitness = 0 if sol.weight > self.c else sol.value
+        sol.invalid = False
+        sol._str_cache = None
+        return sol
+
+    def two_rnd_flips(self, sol):
+        """Perturbs the solution by flipping two distinct random bits,
+        updating the cached weight and value incrementally.
 
-        :param sol:
+        :param sol: the solution to perturb
         """
-        i = random.randint(0, self.n - 1)
-        j = i
-        while j == i:
-            j = random.randint(0, self.n - 1)
-        sol.lst[i] = 0 if sol.lst[i] == 1 else 1
-        sol.lst[j] = 0 if sol.lst[j] == 1 else 1
-        self.full_eval(sol)
+        i, j = self._flip_two(sol)
+        for idx in (i, j):
+            sign = 1 if sol.lst[idx] == 1 else -1
+            sol.weight += sign * int(self.weights[idx])
+            sol.value += sign * int(self.values[idx])
+        sol.fitness = 0 if sol.weight > self.c else sol.value
+        sol.invalid = False
+        sol._str_cache = None
 
 
 class NumberPartitioning(ProblemInstance):
@@ -142,13 +254,15 @@ class NumberPartitioning(ProblemInstance):
         :param k: threshold value
         :param seed: random seed to generate the items
         """
+        super().__init__()
         rnd_gen = random.Random()
         rnd_gen.seed(seed)
         self.n = n
         self.k = k
         self.seed = seed
         l = int(round(math.pow(2, n*k)))
-        self.a = [rnd_gen.randrange(1, l+1) for j in range(n)]
+        self.a = np.asarray([rnd_gen.randrange(1, l+1) for j in range(n)], dtype=np.int64)
+        self.a_total = int(self.a.sum())
 
     def __str__(self):
         return "NPP n=" + str(self.n) + " k=" + str(self.k) + " seed=" + str(self.seed) + " " + str(self.a)
@@ -159,32 +273,61 @@ class NumberPartitioning(ProblemInstance):
     def full_eval(self, sol):
         l = len(sol.lst)
         assert (l == self.n)
-        cost1 = sum([self.a[i] for i in range(l) if sol.lst[i] == 0])
-        cost2 = sum([self.a[i] for i in range(l) if sol.lst[i] == 1])
-        sol.fitness = cost1 - cost2 if cost1 > cost2 else cost2 - cost1
+        cost2 = int(self.a @ sol.lst)
+        sol.signed_sum = self.a_total - 2 * cost2
+        sol.fitness = abs(sol.signed_sum)
         sol.invalid = False
+        sol._str_cache = None
 
-    @staticmethod
-    def has_flip_delta_eval():
-        return False
+    def flip_delta_eval(self, sol, i):
+        """Computes the fitness change of flipping bit i without evaluating
+        the whole solution, using the signed sum cached by full_eval.
 
-    @staticmethod
-    def flip_delta_eval(self, i):
-        raise NotImplementedError()
+        :param sol: the solution whose neighbor is evaluated
+        :param i: the index of the bit to flip
+        :return: a boolean indicating an improving flip and the fitness delta
+        """
+        a_i = int(self.a[i])
+        new_signed = sol.signed_sum + (2 * a_i if sol.lst[i] == 1 else -2 * a_i)
+        delta_fitness = abs(new_signed) - sol.fitness
+        return (delta_fitness < 0), delta_fitness
+
+    def flip_with_delta(self, sol, i, delta_fitness):
+        a_i = int(self.a[i])
+        sol.signed_sum += 2 * a_i if sol.lst[i] == 1 else -2 * a_i
+        sol.lst[i] = 1 if sol.lst[i] == 0 else 0
+        sol.fitness = abs(sol.signed_sum)
+        sol.invalid = False
+        sol._str_cache = None
 
-    @staticmethod
-    def flip_with_delta(self, i):
-        raise NotImplementedError()
+    def best_flip(self, sol):
+        """Evaluates all n flip neighbors in one vectorized pass.
 
-    def two_rnd_flips(self, sol):
+        :param sol: the solution whose neighborhood is evaluated
+        :return: the index of the best flip and the fitness after that flip
         """
+        new_abs = np.abs(sol.signed_sum + np.where(sol.lst == 1, 2 * self.a, -2 * self.a))
+        i = int(np.argmin(new_abs))
+        return i, int(new_abs[i])
+
+    def jit_hc(self, sol, first_improvement=True):
+        """Runs the compiled hill-climb kernel on the solution in place."""
+        sol.signed_sum = int(kernels.hc_npp(sol.lst, self.a, first_improvement))
+        sol.fitness = abs(sol.signed_sum)
+        sol.invalid = False
+        sol._str_cache = None
+        return sol
 
-        :param sol:
+    def two_rnd_flips(self, sol):
+        """Perturbs the solution by flipping two distinct random bits,
+        updating the cached signed sum incrementally.
+
+        :param sol: the solution to perturb
         """
-        i = random.randint(0, self.n - 1)
-        j = i
-        while j == i:
-            j = random.randint(0, self.n - 1)
-        sol.lst[i] = 0 if sol.lst[i] == 1 else 1
-        sol.lst[j] = 0 if sol.lst[j] == 1 else 1
-        self.full_eval(sol)
+        i, j = self._flip_two(sol)
+        for idx in (i, j):
+            a_idx = int(self.a[idx])
+            sol.signed_sum += -2 * a_idx if sol.lst[idx] == 1 else 2 * a_idx
+        sol.fitness = abs(sol.signed_sum)
+        sol.invalid = False
+        sol._str_cache = None